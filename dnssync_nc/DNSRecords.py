@@ -19,18 +19,26 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
-from typing import Optional, TypeVar, Any
+import sys
+import collections
+from typing import Optional, TypeVar, Any, Iterable
 
 TDNSRecord = TypeVar("TDNSRecord", bound="DNSRecord")
 
 class DNSRecord():
+	__slots__ = ("_record_id", "_record_type", "_hostname", "_destination", "_priority", "_delete", "_key", "_hash")
+
 	def __init__(self, record_id: Optional[int], record_type: str, hostname: str, destination: str, priority: Optional[int] = None):
-		self._record_id: Optinal[int] = record_id
-		self._record_type: str = record_type
-		self._hostname:str = hostname
+		self._record_id: Optional[int] = record_id
+		# Only few distinct record types and hostnames occur within a zone
+		self._record_type: str = sys.intern(record_type.upper())
+		self._hostname:str = sys.intern(hostname)
 		self._destination: str = destination
-		self._priority: Optinal[int] = priority
+		self._priority: Optional[int] = priority
 		self._delete: bool = False
+		# All fields of the comparison key are immutable, so compute it once
+		self._key = (self._record_type, self._hostname, self._destination, self._priority)
+		self._hash = hash(self._key)
 
 	@classmethod
 	def new(cls, record_type: str, hostname: str, destination:str, priority: Optional[int] = None) -> TDNSRecord:
@@ -64,23 +72,26 @@ class DNSRecord():
 		return self._delete
 
 	def _cmpkey(self):
-		return (self.record_type, self.hostname, self.destination, self.priority)
+		return self._key
 
 	def delete(self):
 		self._delete = True
 
-	def dump(self, prefix = ""):
+	def format_line(self, prefix = "") -> str:
 		components = [ ]
 		if self.record_id is not None:
 			components.append("[%10d]" % (self.record_id))
 		else:
 			components.append(" " * 12)
-		components.append("%-4s %s -> %s" % (self.record_type.upper(), self.hostname, self.destination))
-		if self.record_type.upper() == "MX":
+		components.append("%-4s %s -> %s" % (self.record_type, self.hostname, self.destination))
+		if self.record_type == "MX":
 			components.append("priority %d" % (self.priority))
 		if self.deleted:
 			components.append("<DELETE>")
-		print(prefix + " ".join(components))
+		return prefix + " ".join(components)
+
+	def dump(self, prefix = ""):
+		print(self.format_line(prefix = prefix))
 
 	@classmethod
 	def deserialize(cls, data) -> TDNSRecord:
@@ -95,31 +106,33 @@ class DNSRecord():
 			record.delete()
 		return record
 
-	def serialize(self) -> dict[str, Any]:
-		if self.deleted and (self.record_id is None):
-			# Delete entirely new record
-			return None
+	def should_serialize(self) -> bool:
+		# Deleting an entirely new record does not need to be sent at all
+		return not (self.deleted and (self.record_id is None))
 
+	def serialize(self) -> dict[str, Any]:
+		# Called for every record on each update, so access the slots
+		# directly instead of going through the properties.
 		result = {
-			"id":			self.record_id,
-			"type":			self.record_type,
-			"hostname":		self.hostname,
-			"destination":	self.destination,
-			"deleterecord":	self.deleted,
+			"id":			self._record_id,
+			"type":			self._record_type,
+			"hostname":		self._hostname,
+			"destination":	self._destination,
+			"deleterecord":	self._delete,
 			"state":		None,
 		}
-		if self.priority is not None:
-			result["priority"] = self.priority
+		if self._priority is not None:
+			result["priority"] = self._priority
 		return result
 
 	def __eq__(self, other):
 		return isinstance(other, DNSRecord) and (self._cmpkey() == other._cmpkey())
 
-	def __neq__(self, other):
-		return not (self == other)
+	def __ne__(self, other):
+		return (not isinstance(other, DNSRecord)) or (self._cmpkey() != other._cmpkey())
 
 	def __hash__(self):
-		return hash(self._cmpkey())
+		return self._hash
 
 	def __repr__(self):
 		return "DNSRecord<%s>" % (str(self._cmpkey()))
@@ -130,13 +143,15 @@ class DNSRecordSet():
 	def __init__(self, domainname):
 		self._domainname: str = domainname
 		self._records: list[TDNSRecord] = [ ]
+		self._records_by_hostname: dict[str, list[TDNSRecord]] = collections.defaultdict(list)
+		self._record_members: set[TDNSRecord] = set()
 
 	@property
 	def domainname(self) -> str:
 		return self._domainname
 
 	@classmethod
-	def from_recoTds(cls, domainname: str, dns_records: TDNSRecordSet) -> TDNSRecordSet:
+	def from_records(cls, domainname: str, dns_records: Iterable[TDNSRecord]) -> TDNSRecordSet:
 		dns_record_set = cls(domainname)
 		for dns_record in dns_records:
 			dns_record_set.add(dns_record)
@@ -147,15 +162,23 @@ class DNSRecordSet():
 			record.delete()
 
 	def delete_hostname(self, hostname: str):
-		for record in self._records:
-			if record.hostname == hostname:
-				record.delete()
+		for record in self._records_by_hostname.get(hostname, [ ]):
+			record.delete()
 
 	def add(self, dns_record: TDNSRecord) -> TDNSRecordSet:
 		assert(isinstance(dns_record, DNSRecord))
 		self._records.append(dns_record)
+		self._records_by_hostname[dns_record.hostname].append(dns_record)
+		self._record_members.add(dns_record)
 		return self
 
+	def diff(self, other: Iterable[TDNSRecord]) -> tuple[set[TDNSRecord], set[TDNSRecord]]:
+		# Returns the records only present in this set and the records only
+		# present in the other set, respectively.
+		own_records = self._record_members
+		other_records = other._record_members if isinstance(other, DNSRecordSet) else set(other)
+		return (own_records - other_records, other_records - own_records)
+
 	@classmethod
 	def deserialize(cls, domainname: str, data: dict[str, Any]) -> TDNSRecordSet:
 		assert(isinstance(data, dict))
@@ -165,9 +188,7 @@ class DNSRecordSet():
 		return record_set
 
 	def serialize(self) -> dict[str, TDNSRecordSet]:
-		records = [ dns_record.serialize() for dns_record in self._records ]
-		records = [ record for record in records if record is not None ]
-		return { "dnsrecords": records }
+		return { "dnsrecords": [ dns_record.serialize() for dns_record in self._records if dns_record.should_serialize() ] }
 
 	def __len__(self):
 		return len(self._records)
@@ -175,9 +196,14 @@ class DNSRecordSet():
 	def __iter__(self):
 		return iter(self._records)
 
+	def __contains__(self, dns_record: TDNSRecord):
+		return dns_record in self._record_members
+
 	def dump(self):
-		for (rec_no, record) in enumerate(self, 1):
-			record.dump(prefix = "	%2d) " % (rec_no))
+		if len(self) == 0:
+			return
+		lines = [ record.format_line(prefix = "	%2d) " % (rec_no)) for (rec_no, record) in enumerate(self, 1) ]
+		sys.stdout.write("\n".join(lines) + "\n")
 
 	def __str__(self):
 		return "DNSRecordSet<%s: %d entries>" % (self.domainname, len(self))
@@ -91,7 +91,7 @@ class DNSZone():
 	def __eq__(self, other):
 		return (self.domainname == other.domainname) and (self.ttl == other.ttl) and (self.refresh == other.refresh) and (self.retry == other.retry) and (self.expire == other.expire) and (self.dnssec == other.dnssec)
 
-	def __neq__(self, other):
+	def __ne__(self, other):
 		return not (self == other)
 
 	def __str__(self):
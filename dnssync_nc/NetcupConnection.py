@@ -19,19 +19,52 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
-import json
 import requests
+import requests.adapters
 from .DNSZone import DNSZone, TDNSZone
 from .DNSRecords import DNSRecord, DNSRecordSet, TDNSRecord, TDNSRecordSet
 from .Exceptions import ServerResponseError
+from .RateLimiter import RateLimiter
 import sys
-
-from typing import Any, TypeVar
+import time
+import random
+import concurrent.futures
+
+from typing import Any, TypeVar, Optional
+
+try:
+	import orjson
+	_json_dumps = orjson.dumps
+	_json_loads = orjson.loads
+except ImportError:
+	try:
+		import msgspec.json
+		_json_dumps = msgspec.json.Encoder().encode
+		_json_loads = msgspec.json.Decoder().decode
+	except ImportError:
+		import json
+		_json_dumps = lambda obj: json.dumps(obj).encode()
+		_json_loads = json.loads
 
 TNetcupConnection = TypeVar("TNetcupConnection", bound="NetcupConnection")
 
 class NetcupConnection():
-	def __init__(self, json_endpoint_uri: str, customer: str, api_key: str, api_password: str):
+	# Actions which do not modify anything may be retried after any
+	# transient server error. Modifying actions might already have been
+	# applied when a 5xx is returned (and would, e.g., create new records
+	# twice), so those are only retried when the server rejected them
+	# outright.
+	_IDEMPOTENT_ACTIONS = ("login", "listallDomains", "infoDnsRecords", "infoDnsZone")
+	_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+	_RETRY_STATUS_CODES_MODIFYING = (429, 503)
+	_MAX_RETRY_DELAY_SECS = 60
+	_MAX_WORKERS = 16
+	# The single session is shared by all worker threads, so it needs one
+	# pooled connection per worker to keep them all alive.
+	_POOL_SIZE = _MAX_WORKERS
+	_TIMEOUT_SECS = 30
+
+	def __init__(self, json_endpoint_uri: str, customer: str, api_key: str, api_password: str, max_rps: Optional[float] = None, max_retries: int = 3):
 		self._uri = json_endpoint_uri
 		self._credentials = {
 			"customer":		customer,
@@ -39,7 +72,17 @@ class NetcupConnection():
 			"api_password":	api_password,
 		}
 		self._session = requests.Session()
+		adapter = requests.adapters.HTTPAdapter(pool_connections = self._POOL_SIZE, pool_maxsize = self._POOL_SIZE, max_retries = 3)
+		self._session.mount("https://", adapter)
+		self._session.mount("http://", adapter)
+		self._session.headers.update({
+			"Content-Type":		"application/json",
+			"Accept-Encoding":	"gzip",
+			"Connection":		"keep-alive",
+		})
 		self._session_id = None
+		self._rate_limiter = RateLimiter(max_rps) if (max_rps is not None) else None
+		self._max_retries = max_retries
 
 	@property
 	def logged_in(self) -> requests.Session:
@@ -50,13 +93,32 @@ class NetcupConnection():
 			"action":	action_name,
 			"param":	params,
 		}
-		payload_data = json.dumps(payload)
-		response = self._session.post(self._uri, data = payload_data)
+		payload_data = _json_dumps(payload)
+		retry_status_codes = self._RETRY_STATUS_CODES if (action_name in self._IDEMPOTENT_ACTIONS) else self._RETRY_STATUS_CODES_MODIFYING
+		for attempt in range(self._max_retries + 1):
+			if self._rate_limiter is not None:
+				self._rate_limiter.acquire()
+			try:
+				response = self._session.post(self._uri, data = payload_data, timeout = self._TIMEOUT_SECS)
+			except requests.exceptions.RequestException as e:
+				raise ServerResponseError("Request '%s' to netcup API failed: %s" % (action_name, str(e))) from e
+			if (response.status_code not in retry_status_codes) or (attempt == self._max_retries):
+				break
+			time.sleep(self._retry_delay(response, attempt))
 		return {
 			"status":	response.status_code,
-			"data":		response.json(),
+			"data":		_json_loads(response.content),
 		}
 
+	@classmethod
+	def _retry_delay(cls, response: requests.Response, attempt: int) -> float:
+		retry_after = response.headers.get("Retry-After")
+		if (retry_after is not None) and retry_after.isdigit():
+			delay = int(retry_after)
+		else:
+			delay = (2 ** attempt) + random.random()
+		return min(delay, cls._MAX_RETRY_DELAY_SECS)
+
 	def _session_action(self, action_name: str, params: dict[str, Any] = None) -> dict[str, Any]:
 		if self._session_id is None:
 			print("Cannot execute '%s' without a valid session.", file = sys.stderr)
@@ -96,6 +158,17 @@ class NetcupConnection():
 			raise ServerResponseError("Unable to retrieve DNS records (no 'success' status): %s" % (response["data"]["longmessage"]))
 		return DNSRecordSet.deserialize(domainname, response["data"]["responsedata"])
 
+	def info_dns_records_many(self, domainnames: list[str], max_workers: Optional[int] = None) -> dict[str, TDNSRecordSet]:
+		# Requests are latency bound, so overlap the round trips of all
+		# domains. All workers share the session so that its keep-alive
+		# connections are reused; only plain post() calls are issued, for
+		# which urllib3's connection pool is thread-safe.
+		if max_workers is None:
+			max_workers = self._MAX_WORKERS
+		with concurrent.futures.ThreadPoolExecutor(max_workers = max_workers) as executor:
+			record_sets = executor.map(self.info_dns_records, domainnames)
+			return { domainname: record_set for (domainname, record_set) in zip(domainnames, record_sets) }
+
 	def info_dns_zone(self, domainname: str) -> dict[str, Any]:
 		response = self._session_action("infoDnsZone", {
 			"domainname":				domainname,
@@ -114,6 +187,25 @@ class NetcupConnection():
 		else:
 			raise ServerResponseError("Unable to update DNS records:", response)
 
+	def sync_dns_records(self, dns_records: TDNSRecordSet) -> TDNSRecordSet:
+		# Only transmits the records which actually differ from the live
+		# state; the netcup API leaves all records not mentioned untouched.
+		current_records = self.info_dns_records(dns_records.domainname)
+		(obsolete_records, missing_records) = current_records.diff(dns_record for dns_record in dns_records if not dns_record.deleted)
+		if (len(obsolete_records) == 0) and (len(missing_records) == 0):
+			return current_records
+
+		changed_records = DNSRecordSet(dns_records.domainname)
+		for current_record in current_records:
+			if current_record in obsolete_records:
+				current_record.delete()
+				changed_records.add(current_record)
+		for dns_record in dns_records:
+			if dns_record in missing_records:
+				missing_records.remove(dns_record)
+				changed_records.add(dns_record)
+		return self.update_dns_records(changed_records)
+
 	def update_dns_zone(self, dns_zone: TDNSZone):
 		response = self._session_action("updateDnsZone", {
 			"domainname":				dns_zone.domainname,
@@ -133,6 +225,6 @@ class NetcupConnection():
 
 	@classmethod
 	def from_credentials_file(cls, filename: str) -> TNetcupConnection:
-		with open(filename) as f:
-			config = json.load(f)
-		return cls(json_endpoint_uri = config["json_endpoint"], customer = config["customer"], api_password = config["api_password"], api_key = config["api_key"])
+		with open(filename, "rb") as f:
+			config = _json_loads(f.read())
+		return cls(json_endpoint_uri = config["json_endpoint"], customer = config["customer"], api_password = config["api_password"], api_key = config["api_key"], max_rps = config.get("max_rps"))
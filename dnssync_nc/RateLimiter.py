@@ -0,0 +1,49 @@
+#	dnssync_nc - DNS API interface for the ISP netcup
+#	Copyright (C) 2020-2022 Johannes Bauer
+#
+#	This file is part of dnssync_nc.
+#
+#	dnssync_nc is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	dnssync_nc is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with dnssync_nc; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+
+import time
+import threading
+
+class RateLimiter():
+	def __init__(self, rate: float, period: float = 1):
+		if (rate <= 0) or (period <= 0):
+			raise ValueError("Rate limit must be positive (got %s requests per %s seconds)." % (rate, period))
+		# A bucket must hold at least one token, otherwise rates below one
+		# request per period could never be satisfied.
+		self._capacity = max(1, rate)
+		self._fill_rate = rate / period
+		self._tokens = self._capacity
+		self._last_refill = time.monotonic()
+		self._lock = threading.Lock()
+
+	def _refill(self):
+		now = time.monotonic()
+		self._tokens = min(self._capacity, self._tokens + (now - self._last_refill) * self._fill_rate)
+		self._last_refill = now
+
+	def acquire(self):
+		with self._lock:
+			self._refill()
+			while self._tokens < 1:
+				time.sleep((1 - self._tokens) / self._fill_rate)
+				self._refill()
+			self._tokens -= 1
@@ -81,25 +81,22 @@ class NetcupCLI():
 			for new_dns_record in new_dns_records:
 				current_dns_records.add(new_dns_record)
 		else:
-			have_action = False
-			new_dns_record_set = set(new_dns_records)
+			(obsolete_records, missing_records) = current_dns_records.diff(new_dns_records)
+			if (len(obsolete_records) == 0) and (len(missing_records) == 0):
+				if self._args.verbose >= 2:
+					print("No update necessary for domain %s." % (current_dns_records.domainname))
+				return
 
 			# Remove records that are not present in the new set
 			for current_record in current_dns_records:
-				if current_record not in new_dns_record_set:
+				if current_record in obsolete_records:
 					current_record.delete()
-					have_action = True
 
 			# Add records that are not present currently
 			for new_dns_record in new_dns_records:
-				if new_dns_record not in current_dns_records:
+				if new_dns_record in missing_records:
+					missing_records.remove(new_dns_record)
 					current_dns_records.add(new_dns_record)
-					have_action = True
-
-			if not have_action:
-				if self._args.verbose >= 2:
-					print("No update necessary for domain %s." % (current_dns_records.domainname))
-				return
 
 		if (self._args.verbose >= 3) or (not self._args.commit):
 			print("Proposed DNS update records of %s (%d records):" % (current_dns_records.domainname, len(current_dns_records)))